@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+Benchmark: orchestrator commands on synthetic .moai trees
+
+Generates a .moai/specs tree per requested size with realistic dependency
+fan-in/fan-out (a few hub specs many others depend on, plus chains of
+nearby specs), a multi-year status history and a local git repository
+whose feature/SPEC-* branches match that history: merged branches for
+verified/completed specs, open branches for in-progress ones and for some
+pending specs git-sync should pick up.
+
+Every command runs end to end in a fresh interpreter, exactly as the
+slash command and the SessionEnd hook invoke it. Commands that write
+(init, git-sync, the hook) get their .moai/indexes restored between runs
+so each repeat measures the same work.
+
+Results are written as JSON. With --baseline, any command whose median
+is more than --threshold slower than the baseline fails the run.
+
+Usage:
+    python benchmarks/bench_commands.py --sizes 1000,10000
+    python benchmarks/bench_commands.py --sizes 100000 --repeat 1 --output bench.json
+    python benchmarks/bench_commands.py --baseline bench.json --threshold 0.2
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+ORCHESTRATOR = REPO_ROOT / "skills" / "moai-orchestrator" / "orchestrator.py"
+HOOK = REPO_ROOT / "hooks" / "session_end__orchestrator_sync.py"
+
+DOMAINS = ["AUTH", "API", "UI", "DATA", "INFRA", "PAY", "SEARCH", "NOTIFY"]
+HUB_EVERY = 50  # every Nth spec is a hub many later specs depend on
+LOCAL_WINDOW = 200  # non-hub dependencies point at recent specs
+BODY = (
+    "## Overview\n\nImplement the behaviour described below and keep the "
+    "public interface stable.\n\n## Acceptance Criteria\n\n"
+    + "".join(f"- Criterion {i}: the system handles case {i} correctly\n" for i in range(40))
+)
+
+# (name, orchestrator args) - None marks the SessionEnd hook
+COMMANDS = [
+    ("init --full", ["init", "--full"]),
+    ("init", ["init"]),
+    ("status", ["status"]),
+    ("next", ["next"]),
+    ("report", ["report"]),
+    ("velocity", ["velocity"]),
+    ("audit", ["audit"]),
+    ("git-sync", ["git-sync", "--no-fetch"]),
+    ("hook", None),
+]
+WRITES = {"init --full", "init", "git-sync", "hook"}
+
+
+def spec_ids(count: int) -> list[str]:
+    return [f"SPEC-{DOMAINS[i % len(DOMAINS)]}-{i:06d}" for i in range(count)]
+
+
+def pick_dependencies(rng: random.Random, i: int, ids: list[str]) -> list[str]:
+    if i == 0:
+        return []
+    deps = set()
+    for _ in range(rng.choices([0, 1, 2, 3, 4, 5], [15, 30, 25, 15, 10, 5])[0]):
+        if rng.random() < 0.3 and i > HUB_EVERY:
+            deps.add(ids[rng.randrange(0, i, HUB_EVERY)])
+        else:
+            deps.add(ids[rng.randrange(max(0, i - LOCAL_WINDOW), i)])
+    return sorted(deps)
+
+
+def generate_history(rng: random.Random, i: int, count: int, now: datetime, years: float):
+    """Status and transitions for spec i; earlier specs are further along."""
+    span = timedelta(days=365 * years)
+    progress = i / count
+    # Work reaches the present around the completed/in-progress boundary
+    created = now - span * max(0.0, 1 - progress / 0.62) - timedelta(
+        days=rng.uniform(0, 30)
+    )
+    if progress < 0.6:
+        status = "completed"
+    elif progress < 0.65:
+        status = rng.choice(["in_progress", "verification", "completed"])
+    elif progress < 0.7:
+        status = rng.choice(["pending", "in_progress"])
+    else:
+        status = "pending"
+
+    history = []
+    when = created
+    for prev, new in (
+        ("pending", "in_progress"),
+        ("in_progress", "verification"),
+        ("verification", "completed"),
+    ):
+        if status == prev:
+            break
+        when = min(when + timedelta(days=rng.uniform(0.3, 14)), now)
+        history.append({"from": prev, "to": new, "timestamp": when.isoformat()})
+    # Occasional rework: sent back from verification and finished again
+    if status == "completed" and rng.random() < 0.1:
+        rework = when + timedelta(days=rng.uniform(0.5, 5))
+        done = rework + timedelta(days=rng.uniform(0.5, 5))
+        if done < now:
+            history += [
+                {"from": "completed", "to": "in_progress", "timestamp": rework.isoformat()},
+                {"from": "in_progress", "to": "completed", "timestamp": done.isoformat()},
+            ]
+    return status, created, history
+
+
+def generate_tree(root: Path, count: int, years: float, seed: int) -> dict:
+    """Write specs, spec-status.json and the git repo; return tree stats."""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    ids = spec_ids(count)
+    specs_dir = root / ".moai" / "specs"
+    specs = {}
+    edges = 0
+
+    for i, spec_id in enumerate(ids):
+        deps = pick_dependencies(rng, i, ids)
+        edges += len(deps)
+        spec_dir = specs_dir / spec_id
+        spec_dir.mkdir(parents=True)
+        (spec_dir / "spec.md").write_text(
+            f"---\nid: {spec_id}\ntitle: Synthetic spec {i}\n"
+            f"dependencies: [{', '.join(deps)}]\n"
+            f"priority: {rng.choice(['high', 'medium', 'low'])}\n---\n\n"
+            f"# {spec_id}\n\n{BODY}",
+            encoding="utf-8",
+        )
+        status, created, history = generate_history(rng, i, count, now, years)
+        if status != "pending" or rng.random() < 0.05:
+            (spec_dir / "verification.py").write_text("import sys\nsys.exit(0)\n")
+        specs[spec_id] = {
+            "status": status,
+            "path": str(spec_dir.relative_to(root / ".moai")),
+            "dependencies": deps,
+            "created_at": created.isoformat(),
+            "history": history,
+        }
+
+    status_file = root / ".moai" / "indexes" / "spec-status.json"
+    status_file.parent.mkdir(parents=True)
+    status_file.write_text(
+        json.dumps(
+            {"version": "1.1", "revision": 0, "last_updated": now.isoformat(), "specs": specs}
+        ),
+        encoding="utf-8",
+    )
+    branches = generate_git_repo(root, specs, rng, now)
+    return {"specs": count, "dependencies": edges, "branches": branches}
+
+
+def generate_git_repo(root: Path, specs: dict, rng: random.Random, now: datetime) -> int:
+    """Build main plus feature/SPEC-* branches with git fast-import."""
+    subprocess.run(["git", "init", "-q", "-b", "main", str(root)], check=True)
+    (root / ".gitignore").write_text(".moai/indexes/\n")
+
+    stream = []
+    main_commits = 200
+    start = int((now - timedelta(days=3 * 365)).timestamp())
+    step = (int(now.timestamp()) - start) // (main_commits + 1)
+
+    def commit(ref, mark, when, parent, message):
+        stream.append(f"commit {ref}\nmark :{mark}\n")
+        stream.append(f"committer Bench <bench@example.com> {when} +0000\n")
+        stream.append(f"data {len(message)}\n{message}\n")
+        if parent:
+            stream.append(f"from :{parent}\n")
+        stream.append("\n")
+
+    for n in range(1, main_commits + 1):
+        commit("refs/heads/main", n, start + n * step, n - 1, f"main {n}")
+
+    mark = main_commits
+    branches = 0
+    for spec_id, spec in specs.items():
+        ref = f"refs/heads/feature/{spec_id}"
+        status = spec["status"]
+        if status in ("verification", "completed") and rng.random() < 0.5:
+            # Merged: fast-forwarded into main, so the tip is a main ancestor
+            stream.append(f"reset {ref}\nfrom :{rng.randrange(1, main_commits)}\n\n")
+        elif status == "in_progress" or (status == "pending" and rng.random() < 0.02):
+            mark += 1
+            when = int(now.timestamp()) - rng.randrange(0, 60 * 86400)
+            commit(ref, mark, when, rng.randrange(1, main_commits + 1), f"wip {spec_id}")
+        else:
+            continue
+        branches += 1
+
+    subprocess.run(
+        ["git", "fast-import", "--quiet"],
+        cwd=root,
+        input="".join(stream),
+        text=True,
+        check=True,
+    )
+    subprocess.run(["git", "pack-refs", "--all"], cwd=root, check=True)
+    return branches
+
+
+def write_transcript(path: Path, ids: list[str], rng: random.Random):
+    """A session transcript that completes a handful of specs."""
+    with open(path, "w", encoding="utf-8") as f:
+        for n in range(2000):
+            text = "Working through the parser refactor and updating tests. " * 8
+            if n % 400 == 399:
+                text += f" {rng.choice(ids)} <promise>DONE</promise>"
+            role = "assistant" if n % 2 else "user"
+            f.write(
+                json.dumps(
+                    {"type": role, "message": {"role": role, "content": [{"type": "text", "text": text}]}}
+                )
+                + "\n"
+            )
+
+
+def run_command(root: Path, name: str, args, storage: str, transcript: Path) -> float:
+    env = {**os.environ, "CLAUDE_PLUGIN_ROOT": str(REPO_ROOT)}
+    if args is None:
+        cmd = [sys.executable, str(HOOK), str(transcript)]
+    else:
+        cmd = [sys.executable, str(ORCHESTRATOR), "--storage", storage, *args]
+    start = time.perf_counter()
+    result = subprocess.run(cmd, cwd=root, env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0 or "Error" in result.stderr:
+        raise RuntimeError(f"{name} failed ({result.returncode}): {result.stderr.strip()}")
+    return elapsed
+
+
+def bench_size(count: int, args, workdir: Path) -> dict:
+    root = workdir / f"tree-{count}"
+    start = time.perf_counter()
+    tree = generate_tree(root, count, args.years, args.seed)
+    tree["generate_s"] = round(time.perf_counter() - start, 2)
+    transcript = workdir / f"transcript-{count}.jsonl"
+    write_transcript(transcript, spec_ids(count), random.Random(args.seed))
+
+    indexes = root / ".moai" / "indexes"
+    if args.storage != "json":
+        run_command(root, "storage import", ["storage", "import"], args.storage, transcript)
+        if args.storage == "eventlog":
+            (indexes / "spec-events.jsonl").touch()
+    pristine = workdir / f"indexes-{count}"
+    shutil.copytree(indexes, pristine)
+
+    commands = {}
+    for name, cmd_args in COMMANDS:
+        if args.commands and name not in args.commands:
+            continue
+        runs = []
+        for _ in range(args.repeat):
+            runs.append(run_command(root, name, cmd_args, args.storage, transcript))
+            if name in WRITES:
+                shutil.rmtree(indexes)
+                shutil.copytree(pristine, indexes)
+        commands[name] = {
+            "median_s": round(statistics.median(runs), 4),
+            "min_s": round(min(runs), 4),
+            "runs": [round(r, 4) for r in runs],
+        }
+        print(f"  {name:<12} median {commands[name]['median_s']:.3f}s", file=sys.stderr)
+    if not args.keep:
+        shutil.rmtree(root)
+        shutil.rmtree(pristine)
+    return {"tree": tree, "commands": commands}
+
+
+def find_regressions(results: dict, baseline: dict, threshold: float, min_delta: float):
+    regressions = []
+    for size, entry in results["sizes"].items():
+        base_entry = baseline.get("sizes", {}).get(size)
+        if not base_entry:
+            continue
+        for name, timing in entry["commands"].items():
+            base = base_entry["commands"].get(name)
+            if not base:
+                continue
+            delta = timing["median_s"] - base["median_s"]
+            if delta > min_delta and timing["median_s"] > base["median_s"] * (1 + threshold):
+                regressions.append(
+                    f"{name} @ {size} specs: {base['median_s']:.3f}s -> "
+                    f"{timing['median_s']:.3f}s (+{delta / base['median_s'] * 100:.0f}%)"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark orchestrator commands")
+    parser.add_argument(
+        "--sizes",
+        default="1000,10000,100000",
+        help="Comma-separated spec counts (default: 1000,10000,100000)",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per command")
+    parser.add_argument("--storage", choices=["json", "eventlog", "sqlite"], default="json")
+    parser.add_argument("--years", type=float, default=3, help="History span in years")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--commands",
+        type=lambda s: s.split(","),
+        help="Only run these commands (e.g. next,report,git-sync)",
+    )
+    parser.add_argument("--output", help="Write JSON results to this file (default: stdout)")
+    parser.add_argument("--baseline", help="Previous results to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="Allowed slowdown vs baseline as a fraction (default: 0.25)",
+    )
+    parser.add_argument(
+        "--min-delta",
+        type=float,
+        default=0.05,
+        help="Ignore slowdowns smaller than this many seconds (default: 0.05)",
+    )
+    parser.add_argument("--workdir", help="Generate trees here instead of a temp dir")
+    parser.add_argument("--keep", action="store_true", help="Keep generated trees")
+    args = parser.parse_args()
+
+    results = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "storage": args.storage,
+        "repeat": args.repeat,
+        "sizes": {},
+    }
+    with tempfile.TemporaryDirectory(dir=args.workdir) as tmp:
+        for count in (int(s) for s in args.sizes.split(",")):
+            print(f"📦 {count} specs", file=sys.stderr)
+            results["sizes"][str(count)] = bench_size(count, args, Path(tmp))
+            if args.keep:
+                kept = Path(args.workdir or ".") / f"tree-{count}"
+                shutil.move(str(Path(tmp) / f"tree-{count}"), kept)
+                print(f"  kept {kept}", file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = find_regressions(results, baseline, args.threshold, args.min_delta)
+        if regressions:
+            for regression in regressions:
+                print(f"❌ {regression}", file=sys.stderr)
+            sys.exit(1)
+        print(f"✅ No regressions above {args.threshold * 100:.0f}%", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
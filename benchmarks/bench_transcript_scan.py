@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Benchmark: SessionEnd transcript scanning
+
+Generates a synthetic JSONL transcript of the requested size and measures
+throughput and peak memory of the streaming TranscriptScanner used by
+hooks/session_end__orchestrator_sync.py. With --legacy-mb, also times the
+original join-everything-then-regex approach on a smaller transcript.
+
+Usage:
+    python benchmarks/bench_transcript_scan.py --size-mb 300
+    python benchmarks/bench_transcript_scan.py --size-mb 50 --legacy-mb 50 --json
+"""
+
+import argparse
+import json
+import random
+import re
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+HOOKS_DIR = Path(__file__).resolve().parent.parent / "hooks"
+sys.path.insert(0, str(HOOKS_DIR))
+
+import session_end__orchestrator_sync as hook  # noqa: E402
+
+FILLER_WORDS = (
+    "refactor the parser so that status transitions are validated before "
+    "writing and add tests for the dependency resolver < > spec words "
+).split()
+
+
+def generate_transcript(path: Path, size_mb: float, markers: int, seed: int = 7) -> int:
+    """Write a JSONL transcript of roughly size_mb and return the marker count."""
+    rng = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+    approx_lines = max(1, target // 2048)
+    marker_lines = set(rng.sample(range(approx_lines), min(markers, approx_lines)))
+    written = 0
+    line_no = 0
+    with open(path, "w", encoding="utf-8") as f:
+        while written < target:
+            words = rng.choices(FILLER_WORDS, k=300)
+            text = " ".join(words)
+            if line_no in marker_lines:
+                text += f" SPEC-BENCH-{line_no:06d} <promise>DONE</promise>"
+            role = "assistant" if line_no % 2 else "user"
+            line = json.dumps(
+                {
+                    "type": role,
+                    "message": {
+                        "role": role,
+                        "content": [{"type": "text", "text": text}],
+                    },
+                }
+            )
+            f.write(line + "\n")
+            written += len(line) + 1
+            line_no += 1
+    return len([n for n in marker_lines if n < line_no])
+
+
+def legacy_extract(path: Path) -> list[str]:
+    """The pre-streaming implementation: join everything, three regex passes."""
+    with open(path, encoding="utf-8") as f:
+        conversation = " ".join(
+            " ".join(hook._message_texts(json.loads(line))) for line in f
+        )
+    found = []
+    found += re.findall(
+        r"(SPEC-[A-Z0-9-]+)[^<]*<promise>DONE</promise>", conversation, re.I
+    )
+    found += re.findall(
+        r"<promise>DONE</promise>[^S]*(SPEC-[A-Z0-9-]+)", conversation, re.I
+    )
+    found += re.findall(
+        r"(?:completed|finished|done):\s*(SPEC-[A-Z0-9-]+)", conversation, re.I
+    )
+    return sorted(set(s.upper() for s in found))
+
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark transcript scanning")
+    parser.add_argument("--size-mb", type=float, default=300)
+    parser.add_argument("--markers", type=int, default=200)
+    parser.add_argument(
+        "--legacy-mb",
+        type=float,
+        default=0,
+        help="Also time the legacy regex approach on a transcript of this size",
+    )
+    parser.add_argument("--json", action="store_true", help="Emit JSON results")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "transcript.jsonl"
+        expected = generate_transcript(path, args.size_mb, args.markers)
+        size = path.stat().st_size
+
+        rss_before = peak_rss_mb()
+        start = time.perf_counter()
+        scanner = hook.scan_transcript(hook.iter_transcript_file(path))
+        elapsed = time.perf_counter() - start
+        results["streaming"] = {
+            "bytes": size,
+            "seconds": round(elapsed, 3),
+            "mb_per_s": round(size / 1024 / 1024 / elapsed, 1),
+            "specs_found": len(scanner.completed),
+            "specs_expected": expected,
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "rss_growth_mb": round(peak_rss_mb() - rss_before, 1),
+        }
+
+        if args.legacy_mb:
+            legacy_path = Path(tmp) / "legacy.jsonl"
+            generate_transcript(legacy_path, args.legacy_mb, args.markers)
+            legacy_size = legacy_path.stat().st_size
+            start = time.perf_counter()
+            found = legacy_extract(legacy_path)
+            elapsed = time.perf_counter() - start
+            results["legacy"] = {
+                "bytes": legacy_size,
+                "seconds": round(elapsed, 3),
+                "mb_per_s": round(legacy_size / 1024 / 1024 / elapsed, 1),
+                "specs_found": len(found),
+                "peak_rss_mb": round(peak_rss_mb(), 1),
+            }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for name, r in results.items():
+        print(f"{name:>10}: {r['bytes'] / 1024 / 1024:.0f} MB in {r['seconds']:.2f}s "
+              f"({r['mb_per_s']} MB/s), {r['specs_found']} SPEC(s), "
+              f"peak RSS {r['peak_rss_mb']} MB")
+    stream = results["streaming"]
+    if stream["specs_found"] != stream["specs_expected"]:
+        print(
+            f"⚠️  expected {stream['specs_expected']} SPEC(s), "
+            f"found {stream['specs_found']}",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Check: git-sync against a local bare repository
+
+Builds a bare "origin" and pushes five kinds of feature branches to it from
+a second clone:
+
+- feature/SPEC-MERGED: merged into main with a merge commit
+- feature/SPEC-OPEN: has commits of its own, not merged
+- feature/SPEC-FRESH: created at main's tip, no work of its own yet
+- feature/SPEC-STALE: created at an older main commit, no work of its own
+- (SPEC-IDLE has no branch at all)
+
+Branches without work of their own are contained in main but must never
+count as merged.
+
+The project clone then runs git-sync through the CLI and checks the
+resulting statuses, that a fetch younger than --fetch-ttl is skipped (so a
+merge pushed meanwhile is not seen yet), and that --fetch-ttl 0 fetches and
+picks the merge up.
+
+Usage:
+    python benchmarks/check_git_sync.py
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ORCHESTRATOR = (
+    Path(__file__).resolve().parent.parent / "skills" / "moai-orchestrator" / "orchestrator.py"
+)
+SPECS = ["SPEC-MERGED", "SPEC-OPEN", "SPEC-FRESH", "SPEC-STALE", "SPEC-IDLE"]
+ENV = {
+    **os.environ,
+    "GIT_AUTHOR_NAME": "check",
+    "GIT_AUTHOR_EMAIL": "check@example.com",
+    "GIT_COMMITTER_NAME": "check",
+    "GIT_COMMITTER_EMAIL": "check@example.com",
+    "MOAI_DAEMON": "0",
+}
+
+
+def git(cwd: Path, *args: str) -> str:
+    return subprocess.run(
+        ["git", *args], cwd=cwd, env=ENV, check=True, capture_output=True, text=True
+    ).stdout
+
+
+def commit(cwd: Path, name: str):
+    (cwd / name).write_text(f"{name}\n")
+    git(cwd, "add", name)
+    git(cwd, "commit", "-q", "-m", f"Add {name}")
+
+
+def orchestrator(project: Path, *args: str) -> str:
+    result = subprocess.run(
+        [sys.executable, str(ORCHESTRATOR), *args],
+        cwd=project, env=ENV, capture_output=True, text=True,
+    )
+    if result.returncode:
+        sys.exit(f"orchestrator {' '.join(args)} failed:\n{result.stdout}{result.stderr}")
+    return result.stdout
+
+
+def statuses(project: Path) -> dict:
+    out = orchestrator(project, "query", "--format", "ndjson")
+    records = (json.loads(line) for line in out.splitlines())
+    return {r["spec_id"]: r["status"] for r in records if r["type"] == "spec"}
+
+
+def main():
+    failures = []
+
+    def expect(label: str, actual, expected):
+        mark = "✅" if actual == expected else "❌"
+        print(f"{mark} {label}: {actual}")
+        if actual != expected:
+            failures.append(f"{label}: expected {expected}, got {actual}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        origin = tmp / "origin.git"
+        seed = tmp / "seed"
+        project = tmp / "project"
+        git(tmp, "init", "-q", "--bare", "-b", "main", str(origin))
+        git(tmp, "clone", "-q", str(origin), str(seed))
+        git(seed, "checkout", "-q", "-b", "main")
+        commit(seed, "README")
+        git(seed, "branch", "feature/SPEC-STALE", "main")
+        commit(seed, "CHANGES")
+        git(seed, "push", "-q", "origin", "main")
+
+        for spec_id in ("SPEC-MERGED", "SPEC-OPEN"):
+            git(seed, "checkout", "-q", "-b", f"feature/{spec_id}", "main")
+            commit(seed, spec_id)
+        git(seed, "checkout", "-q", "main")
+        git(seed, "merge", "-q", "--no-ff", "-m", "Merge branch 'feature/SPEC-MERGED'",
+            "feature/SPEC-MERGED")
+        git(seed, "branch", "feature/SPEC-FRESH", "main")
+        git(seed, "push", "-q", "origin", "main", "feature/SPEC-MERGED",
+            "feature/SPEC-OPEN", "feature/SPEC-FRESH", "feature/SPEC-STALE")
+
+        git(tmp, "clone", "-q", str(origin), str(project))
+        for spec_id in SPECS:
+            spec_dir = project / ".moai" / "specs" / spec_id
+            spec_dir.mkdir(parents=True)
+            (spec_dir / "spec.md").write_text("---\ndependencies: []\n---\n")
+        orchestrator(project, "init")
+
+        orchestrator(project, "git-sync")
+        result = statuses(project)
+        expect("merged branch", result["SPEC-MERGED"], "verification")
+        expect("unmerged branch", result["SPEC-OPEN"], "in_progress")
+        expect("branch at main's tip", result["SPEC-FRESH"], "in_progress")
+        expect("branch at an older main commit", result["SPEC-STALE"], "in_progress")
+        expect("no branch", result["SPEC-IDLE"], "pending")
+        state = json.loads((project / ".moai" / "indexes" / "git-sync.json").read_text())
+        expect("main branch remembered", state.get("main_ref"), "refs/remotes/origin/main")
+        expect("fetch time recorded", "last_fetch" in state, True)
+
+        # Merged on the remote after our fetch: invisible until the TTL ends
+        git(seed, "merge", "-q", "--no-ff", "-m", "Merge branch 'feature/SPEC-OPEN'",
+            "feature/SPEC-OPEN")
+        git(seed, "push", "-q", "origin", "main")
+        out = orchestrator(project, "git-sync")
+        expect("fetch within TTL skipped", "Skipping fetch" in out, True)
+        expect("remote merge unseen", statuses(project)["SPEC-OPEN"], "in_progress")
+
+        out = orchestrator(project, "git-sync", "--fetch-ttl", "0")
+        expect("fetch with TTL 0", "Skipping fetch" in out, False)
+        expect("remote merge after fetch", statuses(project)["SPEC-OPEN"], "verification")
+
+        orchestrator(project, "git-sync", "--no-fetch", "--merged-status", "completed")
+        result = statuses(project)
+        expect("--merged-status completed", result["SPEC-MERGED"], "completed")
+        expect("merged after verification", result["SPEC-OPEN"], "completed")
+        expect("fresh branch after main moved on", result["SPEC-FRESH"], "in_progress")
+        expect("stale branch still unmerged", result["SPEC-STALE"], "in_progress")
+        expect("no branch untouched", result["SPEC-IDLE"], "pending")
+
+    if failures:
+        print("\n".join(["", "Failures:", *failures]))
+        sys.exit(1)
+    print("\n✅ git-sync behaves as expected")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Stress test: concurrent writers against the status store
+
+Spawns many processes that update spec-status.json at the same time, the
+way the SessionEnd hook, git-sync and manual `update` calls can overlap
+across sessions. Each writer owns one spec and cycles its status; some
+writers also reuse one stale MoAIOrchestrator instance so saves must merge
+with changes made by others. With --daemon, a daemon serves the project and
+every other writer sends its updates through it (applying them itself when
+the daemon is busy), so the daemon's in-memory store has to merge with the
+direct writers. Afterwards the store must parse
+and contain every transition that was written.
+
+Usage:
+    python benchmarks/stress_status_store.py --writers 16 --updates 40
+    python benchmarks/stress_status_store.py --storage eventlog
+    python benchmarks/stress_status_store.py --storage sqlite
+    python benchmarks/stress_status_store.py --daemon
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SKILL_DIR = (
+    Path(__file__).resolve().parent.parent / "skills" / "moai-orchestrator"
+)
+CYCLE = ["in_progress", "verification", "completed", "pending"]
+
+
+def _writer(
+    project: str, storage: str, spec_id: str, updates: int, reuse: bool, via_daemon: bool
+):
+    os.chdir(project)
+    sys.path.insert(0, str(SKILL_DIR))
+    import orchestrator_core as orchestrator  # noqa: PLC0415 - MOAI_ROOT is resolved from cwd
+
+    if via_daemon:
+        for i in range(updates):
+            args, pairs = orchestrator.parse_command(
+                ["--storage", storage, "update", spec_id, CYCLE[i % len(CYCLE)]]
+            )
+            response = orchestrator.call_daemon(args, pairs)
+            if response is None:
+                # Daemon busy with another writer: run it here, like the CLI
+                with contextlib.redirect_stdout(io.StringIO()):
+                    orchestrator.MoAIOrchestrator(storage=storage).update_many(pairs)
+            elif response["code"]:
+                sys.exit(f"{spec_id}: daemon update failed: {response}")
+        return
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        orch = orchestrator.MoAIOrchestrator(storage=storage)
+        for i in range(updates):
+            if not reuse:
+                orch = orchestrator.MoAIOrchestrator(storage=storage)
+            orch.update_status(spec_id, CYCLE[i % len(CYCLE)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent status store stress")
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument("--updates", type=int, default=40)
+    parser.add_argument("--storage", choices=["json", "eventlog", "sqlite"], default="json")
+    parser.add_argument(
+        "--daemon", action="store_true", help="Send every other writer through a daemon"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as project:
+        specs_dir = Path(project) / ".moai" / "specs"
+        spec_ids = [f"SPEC-STRESS-{i:03d}" for i in range(args.writers)]
+        for spec_id in spec_ids:
+            (specs_dir / spec_id).mkdir(parents=True)
+            (specs_dir / spec_id / "spec.md").write_text("---\ndependencies: []\n---\n")
+
+        os.chdir(project)
+        sys.path.insert(0, str(SKILL_DIR))
+        import orchestrator_core as orchestrator
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            orchestrator.MoAIOrchestrator(storage=args.storage).init_roadmap()
+
+        daemon = None
+        if args.daemon:
+            daemon = subprocess.Popen(
+                [sys.executable, str(SKILL_DIR / "orchestrator.py"), "--storage", args.storage,
+                 "daemon"],
+                stdout=subprocess.DEVNULL,
+            )
+            socket_file = Path(project) / ".moai" / "indexes" / "orchestrator.sock"
+            while not socket_file.exists():
+                time.sleep(0.05)
+
+        ctx = multiprocessing.get_context("spawn")
+        start = time.perf_counter()
+        procs = [
+            ctx.Process(
+                target=_writer,
+                args=(
+                    project, args.storage, spec_id, args.updates, i % 2 == 0,
+                    args.daemon and i % 2 == 1,
+                ),
+            )
+            for i, spec_id in enumerate(spec_ids)
+        ]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+        elapsed = time.perf_counter() - start
+        if daemon:
+            daemon.terminate()
+            daemon.wait()
+
+        if args.storage != "sqlite":
+            status_file = Path(project) / ".moai" / "indexes" / "spec-status.json"
+            json.loads(status_file.read_text(encoding="utf-8"))  # must not be torn
+        data = orchestrator.MoAIOrchestrator(storage=args.storage).status_data
+
+        failures = []
+        for spec_id in spec_ids:
+            history = data["specs"][spec_id].get("history", [])
+            if len(history) != args.updates:
+                failures.append(f"{spec_id}: {len(history)}/{args.updates} transitions")
+            expected = CYCLE[(args.updates - 1) % len(CYCLE)]
+            if data["specs"][spec_id]["status"] != expected:
+                failures.append(f"{spec_id}: status {data['specs'][spec_id]['status']}")
+
+        total = args.writers * args.updates
+        print(
+            f"{args.writers} writers x {args.updates} updates ({args.storage}"
+            f"{', half via daemon' if args.daemon else ''}): "
+            f"{total} transitions in {elapsed:.2f}s"
+        )
+        if any(p.exitcode for p in procs):
+            failures.append("one or more writer processes failed")
+        if failures:
+            for failure in failures:
+                print(f"❌ {failure}", file=sys.stderr)
+            sys.exit(1)
+        print("✅ All transitions persisted")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,12 @@ Session End Hook: Orchestrator Sync
 
 Detects <promise>DONE</promise> markers in conversation context
 and updates spec-status.json accordingly.
+
+The hook input (stdin) may be the SessionEnd JSON payload with a
+`transcript_path`, a legacy `{"conversation": ...}` / `{"transcript": [...]}`
+object, or a JSONL transcript streamed directly. A transcript path can also
+be passed as the first argument. Transcripts are scanned incrementally, so
+memory stays flat regardless of session length.
 """
 
 import json
@@ -11,8 +17,26 @@ import os
 import re
 import subprocess
 import sys
+from collections import deque
 from pathlib import Path
 
+DONE_MARKER = "<promise>DONE</promise>"
+# How far before/after a DONE marker a SPEC ID may appear
+MARKER_WINDOW = 512
+SPEC_ID_MAX = 64
+# Unprocessed tail kept back while streaming so tokens split across chunk
+# boundaries are matched whole
+_HOLD = SPEC_ID_MAX + len(DONE_MARKER)
+# Small stdin payloads are parsed as a single (possibly pretty-printed) JSON
+_STDIN_PEEK = 1 << 16
+
+_TOKEN_RE = re.compile(
+    rf"(?P<spec>SPEC-[A-Z0-9-]{{1,{SPEC_ID_MAX}}})|(?P<done>{re.escape(DONE_MARKER)})",
+    re.IGNORECASE,
+)
+_DONE_LOWER = DONE_MARKER.lower()
+_STATEMENT_RE = re.compile(r"(?:completed|finished|done):\s*$", re.IGNORECASE)
+
 
 def find_orchestrator_script() -> Path | None:
     """Find orchestrator.py in plugin directory."""
@@ -37,27 +61,209 @@ def find_orchestrator_script() -> Path | None:
     return None
 
 
-def extract_completed_specs(conversation: str) -> list[str]:
-    """Extract SPEC IDs from <promise>DONE</promise> markers."""
-    completed = []
+class TranscriptScanner:
+    """Single-pass, bounded-memory extractor of completed SPEC IDs.
+
+    Recognises the same forms as the original regexes:
+
+    1. a SPEC ID before a DONE marker with no ``<`` in between,
+    2. a SPEC ID after a DONE marker with no ``s``/``S`` in between,
+    3. ``completed|finished|done: SPEC-XXX``,
+
+    but only looks MARKER_WINDOW characters behind or ahead of a marker, so
+    work and memory are proportional to the chunk being fed, not to the
+    whole transcript.
+    """
+
+    def __init__(self):
+        self.completed = set()
+        self.saw_done = False
+        self._buf = ""
+        self._base = 0  # absolute offset of _buf[0]
+        self._pos = 0  # next unscanned index in _buf
+        self._recent = deque()  # (start, end, spec_id) since the last marker
+        self._after_done = None  # absolute end of the last DONE marker
+
+    def feed(self, text: str):
+        if not text:
+            return
+        self._buf += text
+        self._scan(final=False)
+
+    def finish(self) -> list[str]:
+        self._scan(final=True)
+        self._buf = ""
+        return sorted(self.completed)
+
+    def _scan(self, final: bool):
+        buf = self._buf
+        limit = len(buf) if final else len(buf) - _HOLD
+        for m in self._candidates(buf):
+            if m.end() > limit:
+                self._pos = m.start()
+                break
+            if m.lastgroup == "done":
+                self._on_done(m.start(), m.end())
+            else:
+                self._on_spec(m.start(), m.end(), m.group("spec").upper())
+            self._pos = m.end()
+        else:
+            self._pos = max(self._pos, limit)
+
+        # Drop text that can no longer be inside any lookbehind window
+        cut = self._pos - MARKER_WINDOW
+        if cut > MARKER_WINDOW:
+            self._buf = buf[cut:]
+            self._base += cut
+            self._pos -= cut
+
+    def _candidates(self, buf: str):
+        """Yield token matches from _pos on.
+
+        A case-insensitive regex is slow to slide over every position, so
+        the lowercased buffer is searched with str.find and the regex only
+        runs where a token can actually start.
+        """
+        low = buf.lower()
+        if len(low) != len(buf):
+            # Some non-ASCII characters change length when lowercased
+            yield from _TOKEN_RE.finditer(buf, self._pos)
+            return
+        pos = self._pos
+        next_spec = low.find("spec-", pos)
+        next_done = low.find(_DONE_LOWER, pos)
+        while next_spec >= 0 or next_done >= 0:
+            if next_done < 0 or 0 <= next_spec < next_done:
+                start = next_spec
+            else:
+                start = next_done
+            m = _TOKEN_RE.match(buf, start)
+            pos = m.end() if m else start + 1
+            if m:
+                yield m
+            if next_spec >= 0 and next_spec < pos:
+                next_spec = low.find("spec-", pos)
+            if next_done >= 0 and next_done < pos:
+                next_done = low.find(_DONE_LOWER, pos)
+
+    def _on_spec(self, start: int, end: int, spec_id: str):
+        base = self._base
+        # Pattern 3: explicit completion statement right before the ID
+        if _STATEMENT_RE.search(self._buf, max(0, start - SPEC_ID_MAX), start):
+            self.completed.add(spec_id)
+
+        # Pattern 2: first ID after a marker, with no 's' in between
+        if self._after_done is not None:
+            gap_start = self._after_done - base
+            if start - gap_start <= MARKER_WINDOW:
+                gap = self._buf[gap_start:start]
+                if "s" not in gap and "S" not in gap:
+                    self.completed.add(spec_id)
+            self._after_done = None
+
+        recent = self._recent
+        abs_start = base + start
+        while recent and recent[0][0] < abs_start - MARKER_WINDOW:
+            recent.popleft()
+        recent.append((abs_start, base + end, spec_id))
+
+    def _on_done(self, start: int, end: int):
+        self.saw_done = True
+        base = self._base
+        # Pattern 1: first ID after the last '<' preceding the marker
+        lo = max(0, start - MARKER_WINDOW)
+        lt = self._buf.rfind("<", lo, start)
+        boundary = base + (lt + 1 if lt >= 0 else lo)
+        for spec_start, _spec_end, spec_id in self._recent:
+            if spec_start >= boundary:
+                self.completed.add(spec_id)
+                break
+        self._recent.clear()
+        self._after_done = base + end
+
+
+def _message_texts(obj):
+    """Yield the text parts of a hook payload, transcript entry or content."""
+    if isinstance(obj, str):
+        yield obj
+    elif isinstance(obj, list):
+        for item in obj:
+            yield from _message_texts(item)
+    elif isinstance(obj, dict):
+        if isinstance(obj.get("conversation"), str):
+            yield obj["conversation"]
+        if isinstance(obj.get("transcript"), list):
+            yield from _message_texts(obj["transcript"])
+        if isinstance(obj.get("message"), dict):
+            yield from _message_texts(obj["message"])
+        if "text" in obj and isinstance(obj["text"], str):
+            yield obj["text"]
+        if "content" in obj:
+            yield from _message_texts(obj["content"])
+
 
-    # Pattern 1: SPEC-XXX mentioned near DONE marker
-    pattern1 = r"(SPEC-[A-Z0-9-]+)[^<]*<promise>DONE</promise>"
-    matches1 = re.findall(pattern1, conversation, re.IGNORECASE)
-    completed.extend(matches1)
+def iter_transcript_lines(lines):
+    """Yield message text from JSONL lines; non-JSON lines pass through raw."""
+    for line in lines:
+        try:
+            obj = json.loads(line)
+        except json.JSONDecodeError:
+            yield line
+            continue
+        if isinstance(obj, dict) and obj.get("transcript_path"):
+            yield from iter_transcript_file(Path(obj["transcript_path"]))
+        yield from _message_texts(obj)
 
-    # Pattern 2: DONE marker with SPEC reference
-    pattern2 = r"<promise>DONE</promise>[^S]*(SPEC-[A-Z0-9-]+)"
-    matches2 = re.findall(pattern2, conversation, re.IGNORECASE)
-    completed.extend(matches2)
 
-    # Pattern 3: Explicit completion statement
-    pattern3 = r"(?:completed|finished|done):\s*(SPEC-[A-Z0-9-]+)"
-    matches3 = re.findall(pattern3, conversation, re.IGNORECASE)
-    completed.extend(matches3)
+def iter_transcript_file(path: Path):
+    try:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            yield from iter_transcript_lines(f)
+    except OSError as e:
+        print(f"⚠️ Could not read transcript {path}: {e}", file=sys.stderr)
+
+
+def iter_hook_input(stream):
+    """Yield transcript text from the hook's stdin."""
+    head = stream.read(_STDIN_PEEK)
+    if len(head) < _STDIN_PEEK:
+        # Whole payload fits: accept pretty-printed JSON as well
+        try:
+            obj = json.loads(head)
+        except json.JSONDecodeError:
+            obj = None
+        if obj is not None:
+            yield from iter_transcript_lines([json.dumps(obj)])
+            return
+        yield from iter_transcript_lines(head.splitlines(keepends=True))
+        return
+
+    # Stream line by line; the peeked head usually ends mid-line
+    yield from iter_transcript_lines(_rejoin_lines(head, stream))
+
+
+def _rejoin_lines(head: str, stream):
+    *complete, partial = head.split("\n")
+    yield from complete
+    yield partial + stream.readline()
+    yield from stream
 
-    # Deduplicate and uppercase
-    return list(set(s.upper() for s in completed))
+
+def scan_transcript(texts) -> TranscriptScanner:
+    scanner = TranscriptScanner()
+    for text in texts:
+        scanner.feed(text)
+        # Messages were originally joined with a space
+        scanner.feed(" ")
+    scanner.finish()
+    return scanner
+
+
+def extract_completed_specs(conversation: str) -> list[str]:
+    """Extract SPEC IDs from <promise>DONE</promise> markers."""
+    scanner = TranscriptScanner()
+    scanner.feed(conversation)
+    return scanner.finish()
 
 
 def update_spec_status(spec_id: str, orchestrator_script: Path) -> bool:
@@ -80,33 +286,72 @@ def update_spec_status(spec_id: str, orchestrator_script: Path) -> bool:
         return False
 
 
-def main():
-    """Main hook entry point."""
-    # Read hook input from stdin (JSON format)
+def load_orchestrator(orchestrator_script: Path):
+    """Import the orchestrator in-process, or None if it can't be used."""
+    script_dir = str(orchestrator_script.parent)
+    if script_dir not in sys.path:
+        sys.path.insert(0, script_dir)
     try:
-        hook_input = json.load(sys.stdin)
-    except json.JSONDecodeError:
-        sys.stdin.seek(0)
-        hook_input = {"conversation": sys.stdin.read()}
-
-    # Extract conversation content
-    conversation = ""
-    if isinstance(hook_input, dict):
-        conversation = hook_input.get("conversation", "")
-        if not conversation:
-            transcript = hook_input.get("transcript", [])
-            if isinstance(transcript, list):
-                conversation = " ".join(
-                    str(msg.get("content", ""))
-                    for msg in transcript
-                    if isinstance(msg, dict)
+        if (orchestrator_script.parent / "orchestrator_core.py").exists():
+            import orchestrator_core as orchestrator
+        else:  # versions where orchestrator.py held everything
+            import orchestrator
+    except Exception as e:
+        print(f"⚠️ Could not import orchestrator: {e}", file=sys.stderr)
+        return None
+
+    # Older orchestrator versions lack the batch API; use the CLI for those
+    if not hasattr(getattr(orchestrator, "MoAIOrchestrator", None), "update_many"):
+        return None
+    return orchestrator
+
+
+def sync_completed_specs(spec_ids: list[str], orchestrator_script: Path) -> int:
+    """Mark all specs completed in a single load/save cycle.
+
+    Falls back to one `orchestrator.py update` subprocess per spec when the
+    located orchestrator can't be imported.
+    """
+    module = load_orchestrator(orchestrator_script)
+    if module is not None:
+        # MOAI_PROFILE timings cover the in-process update as well
+        timings = None
+        if hasattr(module, "profile_targets"):
+            timings, _ = module.profile_targets()
+            module.TIMINGS.enabled = bool(timings)
+        try:
+            # A running daemon already has the status loaded
+            if hasattr(module, "call_daemon") and not timings:
+                args, updates = module.parse_command(
+                    ["update", *(x for spec_id in spec_ids for x in (spec_id, "completed"))]
                 )
+                response = module.call_daemon(args, updates)
+                if response is not None:
+                    sys.stdout.write(response["stdout"])
+                    sys.stderr.write(response["stderr"])
+                    return len(spec_ids) if response["code"] == 0 else 0
+            orch = module.MoAIOrchestrator()
+            return orch.update_many([(spec_id, "completed") for spec_id in spec_ids])
+        except Exception as e:
+            print(f"⚠️ In-process update failed, falling back: {e}", file=sys.stderr)
+        finally:
+            if timings:
+                module.TIMINGS.report(timings, "session-end")
 
-    if not conversation:
-        sys.exit(0)
+    return sum(update_spec_status(spec_id, orchestrator_script) for spec_id in spec_ids)
+
+
+def main():
+    """Main hook entry point."""
+    # Read hook input from a transcript path argument or stdin
+    if len(sys.argv) > 1:
+        texts = iter_transcript_file(Path(sys.argv[1]))
+    else:
+        texts = iter_hook_input(sys.stdin)
+    scanner = scan_transcript(texts)
 
     # Check for DONE markers
-    if "<promise>DONE</promise>" not in conversation:
+    if not scanner.saw_done:
         sys.exit(0)
 
     # Find orchestrator script
@@ -116,15 +361,14 @@ def main():
         sys.exit(0)
 
     # Extract completed SPECs
-    completed_specs = extract_completed_specs(conversation)
+    completed_specs = sorted(scanner.completed)
     if not completed_specs:
         print("⚠️ DONE marker found but no SPEC ID detected", file=sys.stderr)
         sys.exit(0)
 
-    # Update each completed SPEC
+    # Update all completed SPECs in one pass
     print(f"🔄 Syncing {len(completed_specs)} completed SPEC(s)...")
-    for spec_id in completed_specs:
-        update_spec_status(spec_id, orchestrator)
+    sync_completed_specs(completed_specs, orchestrator)
 
     print("✅ Orchestrator sync complete")
 
@@ -0,0 +1,29 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "skills" / "moai-orchestrator"))
+sys.path.insert(0, str(REPO_ROOT / "hooks"))
+
+
+@pytest.fixture(autouse=True)
+def no_daemon(monkeypatch):
+    monkeypatch.setenv("MOAI_DAEMON", "0")
+    monkeypatch.delenv("MOAI_STORAGE", raising=False)
+    monkeypatch.delenv("MOAI_PROFILE", raising=False)
+
+
+@pytest.fixture
+def make_project(tmp_path):
+    """Create a project whose specs are {spec_id: [dependency, ...]}; returns its .moai."""
+
+    def make(specs: dict, root: Path = tmp_path) -> Path:
+        for spec_id, deps in specs.items():
+            spec_dir = root / ".moai" / "specs" / spec_id
+            spec_dir.mkdir(parents=True)
+            (spec_dir / "spec.md").write_text(f"---\ndependencies: {list(deps)}\n---\n")
+        return root / ".moai"
+
+    return make
@@ -0,0 +1,134 @@
+import json
+import os
+import subprocess
+
+import pytest
+
+import orchestrator_core
+
+START = "2024-03-01T10:00:00+00:00"
+MERGE = "2024-03-08T10:00:00+00:00"
+OPEN_START = "2024-03-15T10:00:00+00:00"
+OLD_START = "2023-01-02T10:00:00+00:00"
+SPECS = ["SPEC-MERGED", "SPEC-OPEN", "SPEC-FRESH", "SPEC-IDLE", "SPEC-LATE"]
+
+
+def git(cwd, *args, date=None):
+    env = {
+        **os.environ,
+        "GIT_AUTHOR_NAME": "test",
+        "GIT_AUTHOR_EMAIL": "test@example.com",
+        "GIT_COMMITTER_NAME": "test",
+        "GIT_COMMITTER_EMAIL": "test@example.com",
+    }
+    if date:
+        env["GIT_AUTHOR_DATE"] = env["GIT_COMMITTER_DATE"] = date
+    subprocess.run(["git", *args], cwd=cwd, env=env, check=True, capture_output=True)
+
+
+def commit(cwd, name, date=None):
+    (cwd / name).write_text(f"{name}\n")
+    git(cwd, "add", name)
+    git(cwd, "commit", "-q", "-m", f"Add {name}", date=date)
+
+
+@pytest.fixture
+def repo(tmp_path, make_project, capsys):
+    """A project repository with feature branches:
+
+    - SPEC-MERGED: first commit at START, merged into main at MERGE
+    - SPEC-OPEN: first commit at OPEN_START, not merged
+    - SPEC-FRESH: created at main's tip, no commits of its own
+    - SPEC-LATE: one commit at OLD_START, not merged
+    - SPEC-IDLE: no branch
+    """
+    git(tmp_path, "init", "-q", "-b", "main")
+    commit(tmp_path, "README", date=OLD_START)
+    for spec_id, date in (("SPEC-MERGED", START), ("SPEC-OPEN", OPEN_START), ("SPEC-LATE", OLD_START)):
+        git(tmp_path, "checkout", "-q", "-b", f"feature/{spec_id}", "main")
+        commit(tmp_path, spec_id, date=date)
+    git(tmp_path, "checkout", "-q", "main")
+    git(
+        tmp_path, "merge", "-q", "--no-ff", "-m", "Merge branch 'feature/SPEC-MERGED'",
+        "feature/SPEC-MERGED", date=MERGE,
+    )
+    git(tmp_path, "branch", "feature/SPEC-FRESH", "main")
+    moai = make_project({spec_id: [] for spec_id in SPECS})
+    (tmp_path / ".gitignore").write_text(".moai/\n")
+    orchestrator_core.MoAIOrchestrator(root=moai).init_roadmap()
+    yield moai
+    capsys.readouterr()
+
+
+def statuses(moai) -> dict:
+    orch = orchestrator_core.MoAIOrchestrator(root=moai)
+    return {spec_id: status for spec_id, status, _ in orch.store.spec_rows()}
+
+
+def history(moai, spec_id) -> list[tuple[str, str]]:
+    store = orchestrator_core.MoAIOrchestrator(root=moai).store
+    return [(h["to"], h["timestamp"]) for h in store.spec_history(spec_id)]
+
+
+def set_statuses(moai, tmp_path, wanted: dict):
+    """Give specs a status with no history, as an import from elsewhere would."""
+    orch = orchestrator_core.MoAIOrchestrator(root=moai)
+    orch.export_status(str(tmp_path / "export.json"))
+    data = json.loads((tmp_path / "export.json").read_text())
+    for spec_id, status in wanted.items():
+        data["specs"][spec_id].update(status=status, history=[])
+    (tmp_path / "export.json").write_text(json.dumps(data))
+    orch.import_status(tmp_path / "export.json")
+
+
+def test_sync_sets_statuses_from_branches(repo):
+    orch = orchestrator_core.MoAIOrchestrator(root=repo)
+    orch.sync_git(fetch=False, main_branch="main")
+    assert statuses(repo) == {
+        "SPEC-MERGED": "verification",
+        "SPEC-OPEN": "in_progress",
+        "SPEC-FRESH": "in_progress",  # no work of its own: never merged
+        "SPEC-LATE": "in_progress",
+        "SPEC-IDLE": "pending",
+    }
+
+    orch.sync_git(fetch=False, main_branch="main", merged_status="completed")
+    assert statuses(repo)["SPEC-MERGED"] == "completed"
+
+
+def test_backfill_adds_branch_and_merge_times(repo, tmp_path):
+    set_statuses(repo, tmp_path, {"SPEC-MERGED": "completed", "SPEC-OPEN": "in_progress"})
+    orchestrator_core.MoAIOrchestrator(root=repo).backfill_git(main_branch="main")
+
+    assert history(repo, "SPEC-MERGED") == [
+        ("in_progress", START),
+        ("verification", MERGE),
+        ("completed", MERGE),
+    ]
+    assert history(repo, "SPEC-OPEN") == [("in_progress", OPEN_START)]
+    assert history(repo, "SPEC-IDLE") == []
+    # Pending specs are left alone until they move on
+    assert history(repo, "SPEC-LATE") == []
+
+
+def test_backfill_is_incremental(repo, tmp_path, capsys):
+    set_statuses(repo, tmp_path, {"SPEC-MERGED": "completed"})
+    orch = orchestrator_core.MoAIOrchestrator(root=repo)
+    orch.backfill_git(main_branch="main")
+    capsys.readouterr()
+
+    # A start seen while SPEC-OPEN was pending is applied once it moves on
+    set_statuses(repo, tmp_path, {"SPEC-OPEN": "in_progress"})
+    orch = orchestrator_core.MoAIOrchestrator(root=repo)
+    orch.backfill_git(main_branch="main")
+    assert "Read 0 commit(s)" in capsys.readouterr().out
+    assert history(repo, "SPEC-OPEN") == [("in_progress", OPEN_START)]
+    assert len(history(repo, "SPEC-MERGED")) == 3
+
+
+def test_backfill_skips_start_after_recorded_completion(repo):
+    orch = orchestrator_core.MoAIOrchestrator(root=repo)
+    orch.update_status("SPEC-LATE", "completed")
+    orch.backfill_git(main_branch="main")
+    # A start from the branch's first commit would make a year-long cycle time
+    assert [to for to, _ in history(repo, "SPEC-LATE")] == ["completed"]
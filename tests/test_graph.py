@@ -0,0 +1,98 @@
+import orchestrator_core
+
+
+def graph(specs: dict) -> orchestrator_core.SpecGraph:
+    """specs: {spec_id: (status, [dependency, ...])}"""
+    return orchestrator_core.SpecGraph(
+        {s: {"status": status, "dependencies": deps} for s, (status, deps) in specs.items()}
+    )
+
+
+def test_ready_set_follows_status_changes():
+    g = graph({
+        "A": ("pending", []),
+        "B": ("pending", ["A"]),
+        "C": ("pending", ["A", "B"]),
+        "D": ("pending", ["MISSING"]),
+    })
+    assert g.ready == {"A", "D"}  # dangling dependencies never block
+    assert g.dangling == {"D": ["MISSING"]}
+    assert g.blocker("C") == "A"
+
+    g.set_status("A", "in_progress")
+    assert g.ready == {"D"}
+    g.set_status("A", "completed")
+    assert g.ready == {"B", "D"}
+    assert g.blocker("C") == "B"
+    g.set_status("B", "completed")
+    assert g.ready == {"C", "D"}
+
+    # Reopening a dependency blocks its dependents again
+    g.set_status("A", "in_progress")
+    assert g.ready == {"D"}
+    assert g.blocker("C") == "A"
+
+
+def test_ready_set_matches_a_fresh_graph():
+    specs = {
+        "A": ("completed", []),
+        "B": ("pending", ["A"]),
+        "C": ("pending", ["B"]),
+        "D": ("verification", ["A"]),
+        "E": ("pending", ["D", "B"]),
+    }
+    g = graph(specs)
+    for spec_id, status in (("B", "completed"), ("D", "completed"), ("C", "in_progress")):
+        g.set_status(spec_id, status)
+        specs[spec_id] = (status, specs[spec_id][1])
+        assert g.ready == graph(specs).ready
+
+
+def test_cycles():
+    g = graph({
+        "A": ("pending", ["C"]),
+        "B": ("pending", ["A"]),
+        "C": ("pending", ["B"]),
+        "D": ("pending", ["D"]),
+        "E": ("pending", ["A"]),
+        "F": ("pending", []),
+    })
+    assert g.cycles() == [["A", "B", "C"], ["D"]]
+    order, leftover = g.topological_order()
+    assert order == ["F"]
+    # E is not in a cycle but waits on one
+    assert leftover == {"A", "B", "C", "D", "E"}
+
+
+def test_acyclic_graph_has_no_cycles():
+    g = graph({"A": ("pending", []), "B": ("pending", ["A"]), "C": ("pending", ["A", "B"])})
+    assert g.cycles() == []
+    order, leftover = g.topological_order()
+    assert order == ["A", "B", "C"] and not leftover
+
+
+def test_critical_path_skips_completed_specs():
+    g = graph({
+        "A": ("completed", []),
+        "B": ("pending", ["A"]),
+        "C": ("pending", ["B"]),
+        "D": ("pending", ["C"]),
+        "E": ("pending", ["A"]),
+        "F": ("in_progress", []),
+    })
+    assert g.critical_path() == ["B", "C", "D"]
+    for spec_id in ("B", "C", "D", "E", "F"):
+        g.set_status(spec_id, "completed")
+    assert g.critical_path() == []
+
+
+def test_unblocks_and_downstream():
+    g = graph({
+        "A": ("pending", []),
+        "B": ("pending", ["A"]),
+        "C": ("pending", ["A", "B"]),
+        "D": ("pending", ["C"]),
+    })
+    assert g.unblocks("A") == ["B"]
+    assert g.downstream("A") == {"B", "C", "D"}
+    assert g.downstream_counts(["A", "C", "D"]) == {"A": 3, "C": 1, "D": 0}
@@ -0,0 +1,72 @@
+import io
+import json
+
+import pytest
+
+import session_end__orchestrator_sync as hook
+
+DONE = "<promise>DONE</promise>"
+
+
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    [
+        # ID before the marker, with no '<' in between
+        (f"Finished SPEC-AUTH-001 {DONE}", ["SPEC-AUTH-001"]),
+        # ...the first one after the last '<', as the original regex matched
+        (f"SPEC-A then SPEC-B {DONE}", ["SPEC-A"]),
+        (f"<i>SPEC-A</i> then SPEC-B {DONE}", ["SPEC-B"]),
+        (f"SPEC-A <b>then</b> {DONE}", []),
+        # ID after the marker, with no 's' in between
+        (f"{DONE} for SPEC-UI-002", ["SPEC-UI-002"]),
+        (f"{DONE} next: SPEC-X", ["SPEC-X"]),
+        (f"{DONE} starting SPEC-X", []),
+        # Explicit completion statements need no marker
+        ("completed: SPEC-DB-003", ["SPEC-DB-003"]),
+        ("Finished:  spec-db-004", ["SPEC-DB-004"]),
+        # Mentions alone don't count
+        ("Working on SPEC-Q, see SPEC-R", []),
+        # Only MARKER_WINDOW characters around a marker are searched
+        (f"SPEC-FAR {'x' * hook.MARKER_WINDOW} {DONE}", []),
+        (f"spec-lower-1 {DONE}", ["SPEC-LOWER-1"]),
+    ],
+)
+def test_done_markers(text, expected):
+    assert hook.extract_completed_specs(text) == expected
+
+
+def test_chunk_boundaries_do_not_matter():
+    text = "".join(
+        f"{'filler ' * 40}Finished SPEC-CH-{i:03d} {DONE} {'more ' * 30}" for i in range(20)
+    )
+    whole = hook.extract_completed_specs(text)
+    assert whole == [f"SPEC-CH-{i:03d}" for i in range(20)]
+    for size in (1, 7, 64, 1000):
+        scanner = hook.TranscriptScanner()
+        for i in range(0, len(text), size):
+            scanner.feed(text[i:i + size])
+        assert scanner.finish() == whole
+
+
+def test_transcript_file_and_payload(tmp_path):
+    transcript = tmp_path / "transcript.jsonl"
+    entries = [
+        {"type": "user", "message": {"role": "user", "content": "Implement SPEC-T-001"}},
+        {
+            "type": "assistant",
+            "message": {
+                "role": "assistant",
+                "content": [{"type": "text", "text": f"SPEC-T-001 {DONE}"}],
+            },
+        },
+        {"type": "assistant", "message": {"content": [{"type": "text", "text": "done: SPEC-T-002"}]}},
+    ]
+    transcript.write_text("".join(json.dumps(e) + "\n" for e in entries))
+
+    payload = io.StringIO(json.dumps({"transcript_path": str(transcript)}))
+    scanner = hook.scan_transcript(hook.iter_hook_input(payload))
+    assert scanner.saw_done
+    assert sorted(scanner.completed) == ["SPEC-T-001", "SPEC-T-002"]
+
+    legacy = io.StringIO(json.dumps({"conversation": f"SPEC-L-001 {DONE}"}))
+    assert sorted(hook.scan_transcript(hook.iter_hook_input(legacy)).completed) == ["SPEC-L-001"]
@@ -0,0 +1,28 @@
+import orchestrator_core
+
+VERIFICATION = """\
+import pathlib, time
+here = pathlib.Path(__file__).parent
+(here / "report.txt").write_text(f"verified at {time.time()}\\n")
+"""
+
+
+def verify(moai, capsys) -> str:
+    orch = orchestrator_core.MoAIOrchestrator(root=moai)
+    assert orch.verify_specs(jobs=1) == 0
+    return capsys.readouterr().out
+
+
+def test_unchanged_spec_is_not_rerun(make_project, capsys):
+    moai = make_project({"SPEC-V": []})
+    (moai / "specs" / "SPEC-V" / "verification.py").write_text(VERIFICATION)
+    orchestrator_core.MoAIOrchestrator(root=moai).init_roadmap()
+    capsys.readouterr()
+
+    assert "(0 cached)" in verify(moai, capsys)
+    # report.txt changed, but the run wrote it
+    assert "(1 cached)" in verify(moai, capsys)
+
+    (moai / "specs" / "SPEC-V" / "spec.md").write_text("---\ndependencies: []\n---\nEdited\n")
+    assert "(0 cached)" in verify(moai, capsys)
+    assert "(1 cached)" in verify(moai, capsys)